@@ -1,15 +1,29 @@
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import os
+import shutil
 import time
 import pycountry
 
 
 def create_breadcrumbs(from_df: pd.DataFrame, in_label_series: list):
-    breadcrumb_df = pd.Series([''] * len(from_df), index=from_df.index)
-    for label in in_label_series:
-        breadcrumb_df = breadcrumb_df + from_df[label].astype(str) + '|'
-    return breadcrumb_df.str[:-1]
+    if not in_label_series:
+        return pd.Series('', index=from_df.index, dtype='string[pyarrow]')
+    label_arrays = [pa.array(from_df[label].astype('string[pyarrow]')) for label in in_label_series]
+    separator = pa.scalar('|', label_arrays[0].type)
+    breadcrumbs = pc.binary_join_element_wise(*label_arrays, separator, null_handling='replace', null_replacement='')
+    return pd.Series(pd.arrays.ArrowStringArray(breadcrumbs), index=from_df.index)
+
+
+def pivot_years(from_df: pd.DataFrame, rest_labels: list, year_column, value_column):
+    pivot_df = from_df[rest_labels + [year_column, value_column]].astype({col: 'category' for col in rest_labels})
+    years = pd.to_numeric(pivot_df[year_column], errors='coerce', downcast='integer')
+    if pd.api.types.is_integer_dtype(years):
+        pivot_df[year_column] = years
+    year_df = pivot_df.set_index(rest_labels + [year_column])[value_column].unstack(year_column)
+    return year_df, year_df.index.to_frame()
 
 
 def map_input(label, available_columns):
@@ -23,18 +37,64 @@ def map_input(label, available_columns):
 
 
 def convert_iso_to_country_name(iso_code):
-    try:
-        if len(iso_code) == 2:
-            country = pycountry.countries.get(alpha_2=iso_code.upper())
-        elif len(iso_code) == 3:
-            country = pycountry.countries.get(alpha_3=iso_code.upper())
-        elif iso_code.isdigit() or iso_code.isnumeric():
-            country = pycountry.countries.get(numeric=iso_code.zfill(3))
-        else:
-            return iso_code
-        return country.name if country else iso_code
-    except:
+    if not isinstance(iso_code, str):
+        return iso_code
+    code = iso_code.upper()
+    if len(code) == 2 and code.isalpha():
+        country = pycountry.countries.get(alpha_2=code)
+    elif len(code) == 3 and code.isalpha():
+        country = pycountry.countries.get(alpha_3=code)
+    elif code.isdigit():
+        country = pycountry.countries.get(numeric=code.zfill(3))
+    else:
+        return iso_code
+    if country is None:
         return iso_code
+    return country.name
+
+
+@st.cache_resource(show_spinner=False)
+def get_iso_country_map():
+    iso_map = {}
+    for country in pycountry.countries:
+        iso_map[country.alpha_2] = country.name
+        iso_map[country.alpha_3] = country.name
+        iso_map[country.numeric] = country.name
+    return iso_map
+
+
+def convert_iso_codes_to_country_names(region: pd.Series):
+    codes = region.astype(str).str.upper()
+    codes = codes.where(~codes.str.isdigit(), codes.str.zfill(3))
+    return codes.map(get_iso_country_map()).fillna(region)
+
+
+def to_long_format(iamc_df: pd.DataFrame, id_vars: list):
+    iamc_df = iamc_df.astype({col: 'category' for col in id_vars})
+    long_df = iamc_df.melt(
+        id_vars=id_vars,
+        var_name='Year',
+        value_name='Value'
+    )
+    years = pd.to_numeric(long_df['Year'], errors='coerce', downcast='integer')
+    if pd.api.types.is_integer_dtype(years):
+        long_df['Year'] = years
+    return long_df
+
+
+def to_csv_bytes(export_df: pd.DataFrame):
+    return export_df.to_csv(index=False).encode('utf-8')
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_csv(file_path, mtime):
+    return pd.read_csv(file_path, engine='pyarrow', dtype_backend='pyarrow')
+
+
+@st.cache_data(show_spinner=False, ttl=5)
+def list_csv_files(folder):
+    with os.scandir(folder) as entries:
+        return [entry.name for entry in entries if entry.name.endswith('.csv') and entry.is_file()]
 
 
 st.set_page_config(
@@ -52,6 +112,7 @@ if "year_transformed" not in st.session_state:
     st.session_state.year_transformed = False
     st.session_state.year_df = None
     st.session_state.rest_labels = None
+    st.session_state.label_df = None
 
 if "mapping_transformed" not in st.session_state:
     st.session_state.mapping_transformed = False
@@ -59,9 +120,11 @@ if "mapping_transformed" not in st.session_state:
 
 if "final_iamc_df" not in st.session_state:
     st.session_state.final_iamc_df = None
+    st.session_state.final_iamc_csv = None
 
 if "final_iamc_long_df" not in st.session_state:
     st.session_state.final_iamc_long_df = None
+    st.session_state.final_iamc_long_csv = None
 
 # --- Data Folder ---
 user_folder = os.path.join("data", "default_user")
@@ -70,6 +133,8 @@ os.makedirs(user_folder, exist_ok=True)
 st.title("DataFrame Uploader & Transformer")
 
 # --- Upload Section ---
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
 st.subheader("Upload a New CSV File")
 uploaded_file = st.file_uploader("Upload CSV", type=['csv'])
 
@@ -80,12 +145,14 @@ if uploaded_file is not None:
         st.warning(f"The file '{uploaded_file.name}' already exists in your folder.")
     else:
         with open(save_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, f, UPLOAD_CHUNK_SIZE)
+        list_csv_files.clear()
         st.success(f"Saved file: {uploaded_file.name} to your folder!")
 
 # --- File Selection Section ---
 st.subheader("Select a CSV File to Load")
-csv_files = [f for f in os.listdir(user_folder) if f.endswith('.csv')]
+csv_files = list_csv_files(user_folder)
 
 if csv_files:
     selected_file = st.selectbox("Choose a CSV file", ["-- Select a file --"] + csv_files)
@@ -95,13 +162,18 @@ if csv_files:
         st.session_state.year_transformed = False
         st.session_state.year_df = None
         st.session_state.rest_labels = None
+        st.session_state.label_df = None
         st.session_state.mapping_transformed = False
         st.session_state.mapping_df = None
         st.rerun()
 
     if selected_file and selected_file != "-- Select a file --":
         file_path = os.path.join(user_folder, selected_file)
-        df = pd.read_csv(file_path)
+        if not os.path.isfile(file_path):
+            # Removed outside the app while the listing was still cached
+            list_csv_files.clear()
+            st.rerun()
+        df = load_csv(file_path, os.path.getmtime(file_path))
         available_columns = df.columns.tolist()
 
         st.subheader("Original DataFrame")
@@ -120,16 +192,19 @@ if csv_files:
         if st.button("Transform Year Columns") and not st.session_state.year_transformed:
             st.subheader("Transformed Year DataFrame (Preview)")
             if years_in_rows:
-                rest_labels = [col for col in available_columns if col not in [year_column, value_column]]
-                year_df = df.pivot(index=rest_labels, columns=year_column, values=value_column)
-                year_df.reset_index(drop=True, inplace=True)
+                excluded_columns = {year_column, value_column}
+                rest_labels = [col for col in available_columns if col not in excluded_columns]
+                year_df, label_df = pivot_years(df, rest_labels, year_column, value_column)
             else:
-                rest_labels = [col for col in available_columns if col not in year_columns]
+                excluded_columns = set(year_columns)
+                rest_labels = [col for col in available_columns if col not in excluded_columns]
                 year_df = df[year_columns]
+                label_df = df
 
             st.session_state.year_df = year_df
             st.session_state.year_transformed = True
             st.session_state.rest_labels = rest_labels
+            st.session_state.label_df = label_df
             st.rerun()
 
         elif st.session_state.year_transformed:
@@ -138,6 +213,7 @@ if csv_files:
                 st.session_state.year_transformed = False
                 st.session_state.year_df = None
                 st.session_state.rest_labels = None
+                st.session_state.label_df = None
                 st.rerun()
 
         # --- Mapping Section ---
@@ -145,9 +221,6 @@ if csv_files:
             st.subheader("Map Columns for Transformation")
 
             available_columns = st.session_state.rest_labels
-            transformed_df = pd.DataFrame(columns=['Model', 'Scenario', 'Region', 'Variable', 'Unit'])
-            transformed_df = transformed_df.reindex(st.session_state.year_df.index)
-
             model_cols, model_text = map_input("Model", available_columns)
             scenario_cols, scenario_text = map_input("Scenario", available_columns)
             region_cols, region_text = map_input("Region", available_columns)
@@ -158,32 +231,38 @@ if csv_files:
             if st.button("Transform DataFrame"):
                 st.subheader("Transformed DataFrame (Preview)")
 
+                mapped_columns = {}
                 if model_text:
-                    transformed_df['Model'] = model_text
+                    mapped_columns['Model'] = model_text
                 elif model_cols:
-                    transformed_df['Model'] = create_breadcrumbs(df, model_cols)
+                    mapped_columns['Model'] = create_breadcrumbs(st.session_state.label_df, model_cols)
 
                 if scenario_text:
-                    transformed_df['Scenario'] = scenario_text
+                    mapped_columns['Scenario'] = scenario_text
                 elif scenario_cols:
-                    transformed_df['Scenario'] = create_breadcrumbs(df, scenario_cols)
+                    mapped_columns['Scenario'] = create_breadcrumbs(st.session_state.label_df, scenario_cols)
 
                 if region_text:
-                    transformed_df['Region'] = region_text
+                    mapped_columns['Region'] = convert_iso_to_country_name(region_text)
                 elif region_cols:
-                    transformed_df['Region'] = create_breadcrumbs(df, region_cols)
-                transformed_df['Region'] = transformed_df['Region'].apply(convert_iso_to_country_name)
+                    region_breadcrumbs = create_breadcrumbs(st.session_state.label_df, region_cols)
+                    mapped_columns['Region'] = convert_iso_codes_to_country_names(region_breadcrumbs)
 
                 if variable_text:
-                    transformed_df['Variable'] = variable_text
+                    mapped_columns['Variable'] = variable_text
                 elif variable_cols:
-                    transformed_df['Variable'] = create_breadcrumbs(df, variable_cols)
+                    mapped_columns['Variable'] = create_breadcrumbs(st.session_state.label_df, variable_cols)
 
                 if unit_text:
-                    transformed_df['Unit'] = unit_text
+                    mapped_columns['Unit'] = unit_text
                 elif unit_cols:
-                    transformed_df['Unit'] = create_breadcrumbs(df, unit_cols)
+                    mapped_columns['Unit'] = create_breadcrumbs(st.session_state.label_df, unit_cols)
 
+                transformed_df = pd.DataFrame(
+                    mapped_columns,
+                    index=st.session_state.year_df.index,
+                    columns=['Model', 'Scenario', 'Region', 'Variable', 'Unit']
+                )
                 st.session_state.mapping_df = transformed_df
                 st.session_state.mapping_transformed = True
                 st.rerun()
@@ -202,6 +281,7 @@ if csv_files:
                 if st.button("Transform to IAMC Format"):
                     final_df = pd.concat([st.session_state.mapping_df, st.session_state.year_df], axis=1).reset_index(drop=True)
                     st.session_state.final_iamc_df = final_df
+                    st.session_state.final_iamc_csv = to_csv_bytes(final_df)
 
             # Show IAMC DataFrame only if it exists
             if st.session_state.final_iamc_df is not None:
@@ -209,10 +289,9 @@ if csv_files:
                 st.dataframe(st.session_state.final_iamc_df, use_container_width=True)
 
                 # CSV Export: IAMC Format (wide)
-                csv_iamc = st.session_state.final_iamc_df.to_csv(index=False)
                 st.download_button(
                     label="📥 Download IAMC Format CSV",
-                    data=csv_iamc,
+                    data=st.session_state.final_iamc_csv,
                     file_name="iamc_format.csv",
                     mime="text/csv"
                 )
@@ -223,16 +302,15 @@ if csv_files:
 
                     expected_id_vars = ['Model', 'Scenario', 'Region', 'Variable', 'Unit']
                     id_vars = [col for col in expected_id_vars if col in df.columns]
-                    year_columns = [col for col in df.columns if col not in id_vars]
+                    id_var_set = set(id_vars)
+                    year_columns = [col for col in df.columns if col not in id_var_set]
 
                     if not id_vars or not year_columns:
                         st.error("Cannot transform to long format: missing identifier columns or year data.")
                     else:
-                        st.session_state.final_iamc_long_df = df.melt(
-                            id_vars=id_vars,
-                            var_name='Year',
-                            value_name='Value'
-                        )
+                        long_df = to_long_format(df, id_vars)
+                        st.session_state.final_iamc_long_df = long_df
+                        st.session_state.final_iamc_long_csv = to_csv_bytes(long_df)
 
             # Show Long Format DataFrame and download option (outside the button block)
             if st.session_state.final_iamc_long_df is not None:
@@ -240,10 +318,9 @@ if csv_files:
                 st.dataframe(st.session_state.final_iamc_long_df, use_container_width=True)
 
                 # CSV Export: Long Format
-                csv_long = st.session_state.final_iamc_long_df.to_csv(index=False)
                 st.download_button(
                     label="📥 Download IAMC Long Format CSV",
-                    data=csv_long,
+                    data=st.session_state.final_iamc_long_csv,
                     file_name="iamc_long_format.csv",
                     mime="text/csv"
                 )
@@ -254,4 +331,5 @@ if csv_files:
 else:
     st.info("No CSV files in your folder. Upload one to get started!")
     if st.button("🔄 Reload Files"):
+        list_csv_files.clear()
         st.rerun()
@@ -0,0 +1,102 @@
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_app(script_name):
+    spec = importlib.util.spec_from_file_location(script_name.replace('-', '_')[:-3], REPO_ROOT / script_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("script_name", ["converter.py", "converter-long.py"])
+def test_create_breadcrumbs_on_pyarrow_frame(script_name, tmp_path, monkeypatch):
+    # The scripts create their data folder relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    app = load_app(script_name)
+
+    csv_path = tmp_path / "labels.csv"
+    csv_path.write_text("a,b\nx,1\n,2\n")
+    df = pd.read_csv(csv_path, engine='pyarrow', dtype_backend='pyarrow')
+
+    assert app.create_breadcrumbs(df, ['a', 'b']).tolist() == ['x|1', '|2']
+    assert app.create_breadcrumbs(df, ['b']).tolist() == ['1', '2']
+    assert app.create_breadcrumbs(df, []).tolist() == ['', '']
+
+
+@pytest.mark.parametrize(
+    "year_labels, expected_years",
+    [
+        (['2020', '2021'], [2020, 2021]),
+        (['40000', '1e5'], [40000, 100000]),
+        (['2020.5', '2021'], ['2020.5', '2021']),
+        (['2020', 'Total'], ['2020', 'Total']),
+    ],
+)
+def test_to_long_format_keeps_year_values(year_labels, expected_years, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = load_app("converter-long.py")
+
+    iamc_df = pd.DataFrame([['DE', 1.0, 2.0]], columns=['Region'] + year_labels)
+    long_df = app.to_long_format(iamc_df, ['Region'])
+
+    assert long_df['Year'].tolist() == expected_years
+    assert long_df['Value'].tolist() == [1.0, 2.0]
+
+
+@pytest.mark.parametrize("script_name", ["converter.py", "converter-long.py"])
+def test_pivot_years_breadcrumbs_line_up_with_year_rows(script_name, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = load_app(script_name)
+
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("Region,Var,Year,Val\nFR,,2021,4\nDE,co2,2020,1\n,ch4,2020,3\nDE,co2,2021,2\n")
+    df = pd.read_csv(csv_path, engine='pyarrow', dtype_backend='pyarrow')
+
+    year_df, label_df = app.pivot_years(df, ['Region', 'Var'], 'Year', 'Val')
+    breadcrumbs = app.create_breadcrumbs(label_df, ['Region', 'Var'])
+
+    assert breadcrumbs.index.equals(year_df.index)
+    assert list(year_df.columns) == [2020, 2021]
+    rows = {crumb: year_df.loc[key].tolist() for crumb, key in zip(breadcrumbs, year_df.index)}
+    assert rows == {'DE|co2': [1, 2], '|ch4': [3, pd.NA], 'FR|': [pd.NA, 4]}
+
+
+ISO_CASES = [
+    ('DE', 'Germany'),
+    ('DEU', 'Germany'),
+    ('de', 'Germany'),
+    ('usa', 'United States'),
+    ('4', 'Afghanistan'),
+    ('12', 'Algeria'),
+    ('040', 'Austria'),
+    ('World', 'World'),
+    ('DE|FR', 'DE|FR'),
+]
+
+
+@pytest.mark.parametrize("script_name", ["converter.py", "converter-long.py"])
+def test_convert_iso_codes_to_country_names(script_name, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = load_app(script_name)
+
+    codes, names = zip(*ISO_CASES)
+    region = pd.Series(codes, dtype='string[pyarrow]')
+
+    assert app.convert_iso_codes_to_country_names(region).tolist() == list(names)
+
+
+@pytest.mark.parametrize("iso_code, expected", ISO_CASES)
+def test_convert_iso_to_country_name_matches_vectorized(iso_code, expected, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = load_app("converter.py")
+
+    vectorized = app.convert_iso_codes_to_country_names(pd.Series([iso_code], dtype='string[pyarrow]'))
+
+    assert app.convert_iso_to_country_name(iso_code) == expected
+    assert vectorized.tolist() == [expected]